@@ -29,13 +29,39 @@
 # Mamadou Doumbia
 # Diego Fustes diego.fustes at toptal.com
 
+from functools import lru_cache, wraps
+
 import numpy as np
-from pyannote.core import Segment, Timeline, Annotation
-from pyannote.core.utils.generators import pairwise
+from pyannote.core import Annotation
+from pyannote.core import segment as core_segment
 
 from .base import BaseMetric, f_measure
 from .utils import UEMSupportMixin
 
+
+def _njit(func):
+    """Compile `func` with numba.njit on first call, when numba is available
+
+    numba is an optional dependency (pip install pyannote.metrics[numba]) that
+    takes a while to import, hence the lazy compilation. Without it, `func`
+    runs as pure (slower) Python.
+    """
+
+    @wraps(func)
+    def wrapper(*args):
+        if wrapper.compiled is None:
+            try:
+                from numba import njit
+            except ImportError:
+                wrapper.compiled = func
+            else:
+                wrapper.compiled = njit(cache=True)(func)
+        return wrapper.compiled(*args)
+
+    wrapper.compiled = None
+    return wrapper
+
+
 PURITY_NAME = 'segmentation purity'
 COVERAGE_NAME = 'segmentation coverage'
 PURITY_COVERAGE_NAME = 'segmentation F[purity|coverage]'
@@ -54,6 +80,457 @@ PR_BOUNDARIES = 'number of boundaries'
 PR_MATCHES = 'number of matches'
 
 
+def _pairs(lo, hi):
+    """All (i, j) pairs such that lo[i] <= j < hi[i]
+
+    Parameters
+    ----------
+    lo, hi : (N, ) np.ndarray
+        Lower (inclusive) and upper (exclusive) bounds of each range.
+
+    Returns
+    -------
+    rows, cols : (n_pairs, ) np.ndarray
+        Pairs, sorted in row-major order.
+    """
+    counts = np.maximum(hi - lo, 0)
+    rows = np.repeat(np.arange(len(lo)), counts)
+    offsets = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts,
+                                                    counts)
+    return rows, np.repeat(lo, counts) + offsets
+
+
+@_njit
+def _greedy_sweep(rows, cols, N, M):
+    """Match candidate pairs in order, skipping already matched boundaries
+
+    Parameters
+    ----------
+    rows, cols : (n_candidates, ) np.ndarray
+        Reference and hypothesis indices of candidate pairs, closest first.
+    N, M : int
+        Number of reference and hypothesis boundaries.
+
+    Returns
+    -------
+    nMatches : int
+        Number of matches.
+    """
+
+    # make sure boundaries cannot be matched twice
+    matchedRef = np.zeros((N, ), dtype=np.bool_)
+    matchedHyp = np.zeros((M, ), dtype=np.bool_)
+
+    nMatches = 0
+    for k in range(len(rows)):
+        i, j = rows[k], cols[k]
+        if matchedRef[i] or matchedHyp[j]:
+            continue
+        matchedRef[i] = True
+        matchedHyp[j] = True
+        nMatches += 1
+
+    return nMatches
+
+
+def _greedy_matching(refBoundaries, hypBoundaries, tolerance):
+    """Greedily match closest pairs of boundaries first
+
+    Parameters
+    ----------
+    refBoundaries : (N, ) np.ndarray
+        Reference boundaries.
+    hypBoundaries : (M, ) np.ndarray
+        Hypothesis boundaries.
+    tolerance : float
+        Boundaries further apart than `tolerance` cannot be matched.
+
+    Returns
+    -------
+    nMatches : int
+        Number of matches.
+    """
+
+    N, M = len(refBoundaries), len(hypBoundaries)
+
+    # for each reference boundary, sorted hypothesis boundaries lo:hi are
+    # (a slightly conservative superset of) those within tolerance
+    order = np.argsort(hypBoundaries, kind='stable')
+    sortedBoundaries = hypBoundaries[order]
+    margin = tolerance + core_segment.SEGMENT_PRECISION
+    lo = np.searchsorted(sortedBoundaries, refBoundaries - margin, side='left')
+    hi = np.searchsorted(sortedBoundaries, refBoundaries + margin, side='right')
+
+    # candidate pairs of boundaries, without building the N x M delta matrix
+    rows, cols = _pairs(lo, hi)
+    cols = order[cols]
+
+    # only pairs of boundaries close enough to each other can be matched
+    delta = np.abs(refBoundaries[rows] - hypBoundaries[cols])
+    close = delta <= tolerance
+    rows, cols, delta = rows[close], cols[close], delta[close]
+
+    # greedily match closest pairs first (ties are broken in row-major order,
+    # the same way as with np.argmin on the delta matrix)
+    order = np.lexsort((cols, rows, delta))
+
+    return _greedy_sweep(rows[order], cols[order], N, M)
+
+
+def _is_separated(boundaries, tolerance):
+    """Check whether sorted boundaries are more than 2 x `tolerance` apart"""
+    return np.all(np.diff(boundaries) >
+                  2 * tolerance + core_segment.SEGMENT_PRECISION)
+
+
+def _separated_matching(refBoundaries, hypBoundaries, tolerance):
+    """Match boundaries, assuming each one has at most one candidate
+
+    This is only valid when both reference and hypothesis boundaries are
+    sorted and more than 2 x `tolerance` apart from each other (see
+    `_is_separated`), in which case it gives the same result as (but is
+    much faster than) `_greedy_matching`.
+
+    Parameters
+    ----------
+    refBoundaries : (N, ) np.ndarray
+        Reference boundaries.
+    hypBoundaries : (M, ) np.ndarray
+        Hypothesis boundaries.
+    tolerance : float
+        Boundaries further apart than `tolerance` cannot be matched.
+
+    Returns
+    -------
+    nMatches : int
+        Number of matches.
+    """
+
+    M = len(hypBoundaries)
+
+    # the only candidate of each reference boundary (if any) is one of its two
+    # closest hypothesis boundaries
+    k = np.searchsorted(hypBoundaries, refBoundaries)
+    before = np.abs(refBoundaries - hypBoundaries[np.maximum(k - 1, 0)])
+    after = np.abs(refBoundaries - hypBoundaries[np.minimum(k, M - 1)])
+
+    return int(np.sum(np.minimum(before, after) <= tolerance))
+
+
+def _batch_is_separated(boundaries, files, tolerance, n_files):
+    """Batch version of `_is_separated`
+
+    Parameters
+    ----------
+    boundaries : np.ndarray
+        Concatenated boundaries of all files.
+    files : np.ndarray
+        Index of the file each boundary belongs to (sorted).
+    tolerance : float
+    n_files : int
+        Number of files.
+
+    Returns
+    -------
+    separated : (n_files, ) np.ndarray
+        Whether boundaries of each file are more than 2 x `tolerance` apart.
+    """
+    too_close = (files[1:] == files[:-1]) & ~(
+        np.diff(boundaries) > 2 * tolerance + core_segment.SEGMENT_PRECISION)
+    return np.bincount(files[1:][too_close], minlength=n_files) == 0
+
+
+def _batch_separated_matching(refBoundaries, refFiles,
+                              hypBoundaries, hypFiles, tolerance, n_files):
+    """Batch version of `_separated_matching`
+
+    Parameters
+    ----------
+    refBoundaries, hypBoundaries : np.ndarray
+        Concatenated reference and hypothesis boundaries of all files, sorted
+        and more than 2 x `tolerance` apart within each file.
+    refFiles, hypFiles : np.ndarray
+        Index of the file each boundary belongs to (sorted).
+    tolerance : float
+    n_files : int
+        Number of files.
+
+    Returns
+    -------
+    nMatches : (n_files, ) np.ndarray
+        Number of matches in each file.
+    """
+
+    N, M = len(refBoundaries), len(hypBoundaries)
+    if N == 0 or M == 0:
+        return np.zeros((n_files, ), dtype=np.int64)
+
+    # number of hypothesis boundaries preceding each reference boundary in
+    # (file, time) order, i.e. np.searchsorted within each file
+    files = np.concatenate([refFiles, hypFiles])
+    order = np.lexsort((np.concatenate([refBoundaries, hypBoundaries]), files))
+    isHyp = order >= N
+    k = np.empty((N, ), dtype=np.int64)
+    k[order[~isHyp]] = (np.cumsum(isHyp) - isHyp)[~isHyp]
+
+    # the only candidate of each reference boundary (if any) is one of its two
+    # closest hypothesis boundaries from the same file
+    first = np.searchsorted(hypFiles, refFiles, side='left')
+    last = np.searchsorted(hypFiles, refFiles, side='right')
+    before = np.where(
+        k > first,
+        np.abs(refBoundaries - hypBoundaries[np.clip(k - 1, 0, M - 1)]),
+        np.inf)
+    after = np.where(
+        k < last,
+        np.abs(refBoundaries - hypBoundaries[np.clip(k, 0, M - 1)]),
+        np.inf)
+    matched = np.minimum(before, after) <= tolerance
+
+    return np.bincount(refFiles[matched], minlength=n_files)
+
+
+def _cooccurrence(reference, hypothesis):
+    """Sparse cooccurrence matrix between two partitions
+
+    This is equivalent to (but much faster and lighter than) the dense
+    cooccurrence matrix between two partitions, as only a handful of pairs of
+    segments can overlap.
+
+    Parameters
+    ----------
+    reference, hypothesis : (starts, ends) tuple
+        Partitions (i.e. sorted, non-overlapping segments), as returned by
+        `_partition`.
+
+    Returns
+    -------
+    rows : (n_entries, ) np.ndarray
+        Index of reference segment of each non-zero entry.
+    cols : (n_entries, ) np.ndarray
+        Index of hypothesis segment of each non-zero entry.
+    durations : (n_entries, ) np.ndarray
+        Cooccurrence duration of each non-zero entry.
+    """
+
+    ref_starts, ref_ends = reference
+    hyp_starts, hyp_ends = hypothesis
+
+    # for each reference segment, hypothesis segments lo:hi overlap with it
+    # (this relies on segments being sorted and non-overlapping)
+    lo = np.searchsorted(hyp_ends, ref_starts, side='right')
+    hi = np.searchsorted(hyp_starts, ref_ends, side='left')
+
+    # all pairs of overlapping (reference, hypothesis) segments
+    rows, cols = _pairs(lo, hi)
+
+    durations = np.minimum(ref_ends[rows], hyp_ends[cols]) - \
+        np.maximum(ref_starts[rows], hyp_starts[cols])
+    overlap = durations > 0
+
+    return rows[overlap], cols[overlap], durations[overlap]
+
+
+def _max_sum(indices, durations):
+    """Sum over `indices` of maximum cooccurrence duration"""
+    if len(indices) == 0:
+        return 0.
+    maximum = np.zeros((np.max(indices) + 1, ))
+    np.maximum.at(maximum, indices, durations)
+    return np.sum(maximum).item()
+
+
+def _partition(starts, ends, coverage, precision):
+    """Partition segments at their boundaries and crop them to `coverage`
+
+    Parameters
+    ----------
+    starts, ends : np.ndarray
+        Start and end times of segments.
+    coverage : (starts, ends) tuple
+        Sorted, non-overlapping coverage segments.
+    precision : float
+        Intervals shorter than `precision` are considered empty (see
+        pyannote.core.segment.SEGMENT_PRECISION).
+
+    Returns
+    -------
+    starts, ends : np.ndarray
+        Start and end times of (sorted, non-overlapping) partition segments.
+        This is equivalent to (and much faster than) cropping the annotation
+        made of every interval between two consecutive boundaries.
+    """
+
+    coverage_starts, coverage_ends = coverage
+    if len(starts) == 0 or len(coverage_starts) == 0:
+        return np.empty((0, )), np.empty((0, ))
+
+    # boundaries (as sorted array of unique timestamps)
+    boundaries = np.unique(np.concatenate([starts, ends]))
+
+    # also split at coverage boundaries, so that every resulting interval is
+    # either fully inside or fully outside coverage
+    cropped = np.concatenate([coverage_starts, coverage_ends])
+    cropped = cropped[(cropped > boundaries[0]) & (cropped < boundaries[-1])]
+    boundaries = np.unique(np.concatenate([boundaries, cropped]))
+    starts, ends = boundaries[:-1], boundaries[1:]
+
+    # only keep (non-empty) intervals inside coverage
+    middles = .5 * (starts + ends)
+    k = np.maximum(np.searchsorted(coverage_starts, middles,
+                                   side='right') - 1, 0)
+    inside = (coverage_starts[k] <= middles) & (middles < coverage_ends[k]) & \
+        (ends - starts > precision)
+
+    return starts[inside], ends[inside]
+
+
+def _support(starts, ends, precision, collar=0.):
+    """Vectorized equivalent of Timeline.support
+
+    Parameters
+    ----------
+    starts, ends : np.ndarray
+        Start and end times of segments, sorted by start time.
+    precision : float
+        Gaps shorter than `precision` are considered empty (see
+        pyannote.core.segment.SEGMENT_PRECISION).
+    collar : float, optional
+        Merge segments separated by less than `collar` seconds.
+
+    Returns
+    -------
+    starts, ends : np.ndarray
+        Start and end times of support segments.
+    """
+
+    if len(starts) == 0:
+        return starts, ends
+
+    # gap between each segment and the union of all previous ones
+    gaps = starts[1:] - np.maximum.accumulate(ends)[:-1]
+
+    # a new support segment starts after each (non-empty) gap not shorter
+    # than collar
+    first = np.flatnonzero(np.concatenate([
+        [True], (gaps > precision) & (gaps >= collar)]))
+
+    return starts[first], np.maximum.reduceat(ends, first)
+
+
+def _read_only(*arrays):
+    """Prevent (cached, hence shared) arrays from being modified in place"""
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+
+@lru_cache(maxsize=32)
+def _preprocess_reference(tracks, tolerance, precision):
+    """Fill short intra-label gaps of reference and partition it
+
+    Results are cached because the same reference is usually evaluated
+    against many hypotheses. Returned partition and coverage are therefore
+    shared between calls, and made read-only. Only the 32 most recently
+    used references are kept (use `_preprocess_reference.cache_clear()` to
+    free them).
+
+    Parameters
+    ----------
+    tracks : tuple
+        Reference (segment, track, label) tuples, as yielded by
+        `reference.itertracks(yield_label=True)`.
+    tolerance : float
+        Intra-label gaps shorter than `tolerance` (in seconds) are filled.
+    precision : float
+        Current pyannote.core.segment.SEGMENT_PRECISION, which results
+        depend on (and which can be changed with Segment.set_precision).
+
+    Returns
+    -------
+    partition : (starts, ends) tuple
+        Partition of reference after filling gaps.
+    coverage : (starts, ends) tuple
+        Reference coverage after filling gaps.
+    """
+
+    labels = {}
+    starts, ends, indices = [], [], []
+    for segment, _, label in tracks:
+        starts.append(segment.start)
+        ends.append(segment.end)
+        indices.append(labels.setdefault(label, len(labels)))
+    starts = np.array(starts, dtype=np.float64)
+    ends = np.array(ends, dtype=np.float64)
+    indices = np.array(indices, dtype=np.int64)
+
+    # group segments by label (stable sort keeps them sorted by start time)
+    order = np.argsort(indices, kind='stable')
+    starts, ends, indices = starts[order], ends[order], indices[order]
+    groups = np.flatnonzero(np.diff(indices)) + 1
+
+    # reference where short intra-label gaps are removed
+    filled_starts, filled_ends = [], []
+    for label_starts, label_ends in zip(np.split(starts, groups),
+                                        np.split(ends, groups)):
+        label_starts, label_ends = _support(label_starts, label_ends,
+                                            precision, collar=tolerance)
+        filled_starts.append(label_starts)
+        filled_ends.append(label_ends)
+    filled_starts = np.concatenate(filled_starts)
+    filled_ends = np.concatenate(filled_ends)
+
+    # reference coverage after filling gaps
+    order = np.lexsort((filled_ends, filled_starts))
+    coverage = _support(filled_starts[order], filled_ends[order], precision)
+
+    partition = _partition(filled_starts, filled_ends, coverage, precision)
+
+    return _read_only(*partition), _read_only(*coverage)
+
+
+@lru_cache(maxsize=8)
+def _preprocess(tracks, segments, tolerance, precision):
+    """Partition both reference and hypothesis
+
+    Results are cached because purity and coverage of the same pair of
+    reference and hypothesis are usually computed together. Returned
+    partitions are therefore shared between calls, and made read-only. Only
+    the 8 most recently used pairs are kept (use `_preprocess.cache_clear()`
+    to free them).
+
+    Parameters
+    ----------
+    tracks : tuple
+        Reference (segment, track, label) tuples, as yielded by
+        `reference.itertracks(yield_label=True)`.
+    segments : tuple
+        Hypothesis segments.
+    tolerance : float
+        Reference intra-label gaps shorter than `tolerance` (in seconds) are
+        filled.
+    precision : float
+        Current pyannote.core.segment.SEGMENT_PRECISION, which results
+        depend on (and which can be changed with Segment.set_precision).
+
+    Returns
+    -------
+    reference_partition, hypothesis_partition : (starts, ends) tuple
+        Reference and hypothesis partitions.
+    """
+
+    # reference partition and coverage after filling short gaps
+    reference_partition, coverage = _preprocess_reference(tracks, tolerance,
+                                                          precision)
+
+    starts = np.array([segment.start for segment in segments],
+                      dtype=np.float64)
+    ends = np.array([segment.end for segment in segments], dtype=np.float64)
+    hypothesis_partition = _partition(starts, ends, coverage, precision)
+
+    return reference_partition, _read_only(*hypothesis_partition)
+
+
 class SegmentationCoverage(BaseMetric):
     """Segmentation coverage
 
@@ -69,57 +546,28 @@ class SegmentationCoverage(BaseMetric):
         super(SegmentationCoverage, self).__init__(**kwargs)
         self.tolerance = tolerance
 
-    def _partition(self, timeline, coverage):
-
-        # boundaries (as set of timestamps)
-        boundaries = set([])
-        for segment in timeline:
-            boundaries.add(segment.start)
-            boundaries.add(segment.end)
-
-        # partition (as timeline)
-        partition = Annotation()
-        for start, end in pairwise(sorted(boundaries)):
-            segment = Segment(start, end)
-            partition[segment] = '_'
-
-        return partition.crop(coverage, mode='intersection').relabel_tracks()
-
     def _preprocess(self, reference, hypothesis):
 
         if not isinstance(reference, Annotation):
             raise TypeError('reference must be an instance of `Annotation`')
 
         if isinstance(hypothesis, Annotation):
-            hypothesis = hypothesis.get_timeline()
-
-        # reference where short intra-label gaps are removed
-        filled = Timeline()
-        for label in reference.labels():
-            label_timeline = reference.label_timeline(label)
-            for gap in label_timeline.gaps():
-                if gap.duration < self.tolerance:
-                    label_timeline.add(gap)
+            hypothesis = hypothesis.get_timeline(copy=False)
 
-            for segment in label_timeline.support():
-                filled.add(segment)
-
-        # reference coverage after filling gaps
-        coverage = filled.support()
-
-        reference_partition = self._partition(filled, coverage)
-        hypothesis_partition = self._partition(hypothesis, coverage)
-
-        return reference_partition, hypothesis_partition
+        # cached, so that purity and coverage of the same pair of reference
+        # and hypothesis share the same preprocessing
+        return _preprocess(tuple(reference.itertracks(yield_label=True)),
+                           tuple(hypothesis), self.tolerance,
+                           core_segment.SEGMENT_PRECISION)
 
     def _process(self, reference, hypothesis):
 
         detail = self.init_components()
 
         # cooccurrence matrix
-        K = reference * hypothesis
-        detail[PTY_CVG_TOTAL] = np.sum(K).item()
-        detail[PTY_CVG_INTER] = np.sum(np.max(K, axis=1)).item()
+        rows, _, durations = _cooccurrence(reference, hypothesis)
+        detail[PTY_CVG_TOTAL] = np.sum(durations).item()
+        detail[PTY_CVG_INTER] = _max_sum(rows, durations)
 
         return detail
 
@@ -192,13 +640,13 @@ class SegmentationPurityCoverageFMeasure(SegmentationCoverage):
         detail = self.init_components()
 
         # cooccurrence matrix coverage
-        K = reference * hypothesis
-        detail[CVG_TOTAL] = np.sum(K).item()
-        detail[CVG_INTER] = np.sum(np.max(K, axis=1)).item()
+        rows, cols, durations = _cooccurrence(reference, hypothesis)
+        detail[CVG_TOTAL] = np.sum(durations).item()
+        detail[CVG_INTER] = _max_sum(rows, durations)
 
         # cooccurrence matrix purity
         detail[PTY_TOTAL] = detail[CVG_TOTAL]
-        detail[PTY_INTER] = np.sum(np.max(K, axis=0)).item()
+        detail[PTY_INTER] = _max_sum(cols, durations)
 
         return detail
 
@@ -271,22 +719,29 @@ class SegmentationPrecision(UEMSupportMixin, BaseMetric):
         super(SegmentationPrecision, self).__init__(**kwargs)
         self.tolerance = tolerance
 
-    def compute_components(self, reference, hypothesis, **kwargs):
-
+    @staticmethod
+    def _boundaries(timeline):
         # extract timeline if needed
-        if isinstance(reference, Annotation):
-            reference = reference.get_timeline()
-        if isinstance(hypothesis, Annotation):
-            hypothesis = hypothesis.get_timeline()
+        if isinstance(timeline, Annotation):
+            timeline = timeline.get_timeline(copy=False)
+        # internal boundaries (an empty timeline has no boundary either)
+        return np.array([segment.end for segment in timeline][:-1],
+                        dtype=np.float64)
+
+    def compute_components(self, reference, hypothesis, **kwargs):
 
         detail = self.init_components()
 
         # number of matches so far...
         nMatches = 0.  # make sure it is a float (for later ratio)
 
+        # reference and hypothesis boundaries
+        refBoundaries = self._boundaries(reference)
+        hypBoundaries = self._boundaries(hypothesis)
+
         # number of boundaries in reference and hypothesis
-        N = len(reference) - 1
-        M = len(hypothesis) - 1
+        N = len(refBoundaries)
+        M = len(hypBoundaries)
 
         # number of boundaries in hypothesis
         detail[PR_BOUNDARIES] = M
@@ -296,44 +751,91 @@ class SegmentationPrecision(UEMSupportMixin, BaseMetric):
             detail[PR_MATCHES] = 0.
             return detail
 
-        # reference and hypothesis boundaries
-        refBoundaries = [segment.end for segment in reference][:-1]
-        hypBoundaries = [segment.end for segment in hypothesis][:-1]
-
-        # temporal delta between all pairs of boundaries
-        delta = np.zeros((N, M))
-        for r, refBoundary in enumerate(refBoundaries):
-            for h, hypBoundary in enumerate(hypBoundaries):
-                delta[r, h] = abs(refBoundary - hypBoundary)
-
-        # make sure boundaries too far apart from each other cannot be matched
-        # (this is what np.inf is used for)
-        delta[np.where(delta > self.tolerance)] = np.inf
-
-        # h always contains the minimum value in delta matrix
-        # h == np.inf means that no boundary can be matched
-        h = np.amin(delta)
-
-        # while there are still boundaries to match
-        while h < np.inf:
-            # increment match count
-            nMatches += 1
-
-            # find boundaries to match
-            k = np.argmin(delta)
-            i = k // M
-            j = k % M
-
-            # make sure they cannot be matched again
-            delta[i, :] = np.inf
-            delta[:, j] = np.inf
-
-            # update minimum value in delta
-            h = np.amin(delta)
+        # fast path when boundaries are far apart from each other:
+        # there is no need to choose between several candidates
+        if _is_separated(refBoundaries, self.tolerance) and \
+                _is_separated(hypBoundaries, self.tolerance):
+            nMatches += _separated_matching(refBoundaries, hypBoundaries,
+                                            self.tolerance)
+        else:
+            nMatches += _greedy_matching(refBoundaries, hypBoundaries,
+                                         float(self.tolerance))
 
         detail[PR_MATCHES] = nMatches
         return detail
 
+    def batch_details(self, references, hypotheses):
+        """Compute metric components of many files at once
+
+        This is equivalent to (but faster than) calling `compute_components`
+        on each (reference, hypothesis) pair, as most of the work is done in
+        one vectorized pass over the boundaries of all files.
+
+        Parameters
+        ----------
+        references : list of Timeline or Annotation
+            Manual references.
+        hypotheses : list of Timeline or Annotation
+            Evaluated hypotheses (one per reference).
+
+        Returns
+        -------
+        details : list of dict
+            Components of each (reference, hypothesis) pair.
+        """
+
+        if len(references) != len(hypotheses):
+            msg = (
+                'Got {0:d} references but {1:d} hypotheses: there must be '
+                'exactly one hypothesis per reference.'
+            ).format(len(references), len(hypotheses))
+            raise ValueError(msg)
+
+        refBoundaries = [self._boundaries(r) for r in references]
+        hypBoundaries = [self._boundaries(h) for h in hypotheses]
+        n_files = len(refBoundaries)
+
+        # number of boundaries in reference and hypothesis of each file
+        N = np.array([len(b) for b in refBoundaries], dtype=np.int64)
+        M = np.array([len(b) for b in hypBoundaries], dtype=np.int64)
+
+        # concatenate boundaries of all files, keeping track of their file
+        refFiles = np.repeat(np.arange(n_files), N)
+        hypFiles = np.repeat(np.arange(n_files), M)
+        # (empty arrays make sure concatenation works with no file at all)
+        allRefBoundaries = np.concatenate(refBoundaries + [np.empty((0, ))])
+        allHypBoundaries = np.concatenate(hypBoundaries + [np.empty((0, ))])
+
+        # fast path for files whose boundaries are far apart from each other:
+        # there is no need to choose between several candidates
+        separated = \
+            _batch_is_separated(allRefBoundaries, refFiles,
+                                self.tolerance, n_files) & \
+            _batch_is_separated(allHypBoundaries, hypFiles,
+                                self.tolerance, n_files)
+        ref = separated[refFiles]
+        hyp = separated[hypFiles]
+        nMatches = _batch_separated_matching(
+            allRefBoundaries[ref], refFiles[ref],
+            allHypBoundaries[hyp], hypFiles[hyp],
+            self.tolerance, n_files).astype(np.float64)
+
+        # other files (with at least one boundary in both reference and
+        # hypothesis) go through greedy matching
+        for f in np.flatnonzero(~separated & (N > 0) & (M > 0)):
+            nMatches[f] = _greedy_matching(refBoundaries[f], hypBoundaries[f],
+                                           float(self.tolerance))
+
+        details = []
+        for f in range(n_files):
+            detail = self.init_components()
+            detail[PR_BOUNDARIES] = M[f].item()
+            # make sure it is a float (for later ratio)
+            detail[PR_MATCHES] = nMatches[f].item()
+            details.append(detail)
+
+        return details
+
     def compute_metric(self, detail):
 
         numerator = detail[PR_MATCHES]
@@ -379,6 +881,10 @@ class SegmentationRecall(SegmentationPrecision):
     def metric_name(cls):
         return RECALL_NAME
 
+    def batch_details(self, references, hypotheses):
+        return super(SegmentationRecall, self).batch_details(
+            hypotheses, references)
+
     def compute_components(self, reference, hypothesis, **kwargs):
         return super(SegmentationRecall, self).compute_components(
             hypothesis, reference)
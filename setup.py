@@ -53,6 +53,9 @@ setup(
         'matplotlib >= 2.0.0',
         'sympy >= 1.1',
     ],
+    extras_require={
+        'numba': ['numba'],
+    },
     # versioneer
     version=versioneer.get_version(),
     cmdclass=versioneer.get_cmdclass(),
@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2020 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+import pytest
+
+from pyannote.core import Annotation
+from pyannote.core import Segment
+from pyannote.core import Timeline
+from pyannote.metrics.segmentation import SegmentationCoverage
+from pyannote.metrics.segmentation import SegmentationPurity
+from pyannote.metrics.segmentation import SegmentationPurityCoverageFMeasure
+from pyannote.metrics.segmentation import SegmentationPrecision
+from pyannote.metrics.segmentation import SegmentationRecall
+from pyannote.metrics.segmentation import _preprocess
+from pyannote.metrics.segmentation import _preprocess_reference
+
+import numpy.testing as npt
+
+# Time        0  1  2  3  4  5  6  7  8  9 10 11 12 13 14 15 16 17 18 19 20
+# Reference   |--------------||-------|-----------|  |--------------------|
+#                   A               A        B                 C
+
+# Time        0  1  2  3  4  5  6  7  8  9 10 11 12 13 14 15 16 17 18 19 20
+# Hypothesis  |-----------|-----------------|-----------------|-----------|
+#                   a              b                 c              d
+
+
+@pytest.fixture
+def reference():
+    reference = Annotation()
+    reference[Segment(0, 5)] = 'A'
+    reference[Segment(5.2, 8)] = 'A'
+    reference[Segment(8, 12)] = 'B'
+    reference[Segment(13, 20)] = 'C'
+    return reference
+
+
+@pytest.fixture
+def hypothesis():
+    hypothesis = Annotation()
+    hypothesis[Segment(0, 4)] = 'a'
+    hypothesis[Segment(4, 10)] = 'b'
+    hypothesis[Segment(10, 16)] = 'c'
+    hypothesis[Segment(16, 20)] = 'd'
+    return hypothesis
+
+
+def test_coverage(reference, hypothesis):
+    segmentationCoverage = SegmentationCoverage(tolerance=0.)
+    coverage = segmentationCoverage(reference, hypothesis)
+    npt.assert_almost_equal(coverage, 0.6809, decimal=3)
+
+
+def test_coverage_tolerance(reference, hypothesis):
+    # 200ms gap between the two 'A' segments is filled
+    segmentationCoverage = SegmentationCoverage(tolerance=0.5)
+    coverage = segmentationCoverage(reference, hypothesis)
+    npt.assert_almost_equal(coverage, 0.5263, decimal=3)
+
+
+def test_coverage_modified_reference(reference, hypothesis):
+    # preprocessed reference is cached: editing it in place must not lead
+    # to stale results
+    segmentationCoverage = SegmentationCoverage(tolerance=0.)
+    npt.assert_almost_equal(segmentationCoverage(reference, hypothesis),
+                            0.6809, decimal=3)
+    reference[Segment(12, 13)] = 'D'
+    npt.assert_almost_equal(segmentationCoverage(reference, hypothesis),
+                            0.6970, decimal=3)
+
+
+def test_cached_reference_is_read_only(reference):
+    tracks = tuple(reference.itertracks(yield_label=True))
+    partition, coverage = _preprocess_reference(tracks, 0.5, 1e-6)
+    for array in partition + coverage:
+        with pytest.raises(ValueError):
+            array[0] = -1.
+
+
+def test_purity(reference, hypothesis):
+    segmentationPurity = SegmentationPurity(tolerance=0.)
+    purity = segmentationPurity(reference, hypothesis)
+    npt.assert_almost_equal(purity, 0.8936, decimal=3)
+
+
+def test_purity_tolerance(reference, hypothesis):
+    segmentationPurity = SegmentationPurity(tolerance=0.5)
+    purity = segmentationPurity(reference, hypothesis)
+    npt.assert_almost_equal(purity, 0.8947, decimal=3)
+
+
+def test_purity_coverage_cache(reference, hypothesis):
+    # purity and coverage of the same pair share cached preprocessing
+    purity = SegmentationPurity(tolerance=0.5)(reference, hypothesis)
+    coverage = SegmentationCoverage(tolerance=0.5)(reference, hypothesis)
+    _preprocess.cache_clear()
+    _preprocess_reference.cache_clear()
+    npt.assert_almost_equal(
+        SegmentationCoverage(tolerance=0.5)(reference, hypothesis),
+        coverage, decimal=7)
+    _preprocess.cache_clear()
+    _preprocess_reference.cache_clear()
+    npt.assert_almost_equal(
+        SegmentationPurity(tolerance=0.5)(reference, hypothesis),
+        purity, decimal=7)
+    npt.assert_almost_equal(purity, 0.8947, decimal=3)
+    npt.assert_almost_equal(coverage, 0.5263, decimal=3)
+
+
+def test_purity_coverage_fmeasure(reference, hypothesis):
+    metric = SegmentationPurityCoverageFMeasure(tolerance=0.5)
+    details = metric(reference, hypothesis, detailed=True)
+    npt.assert_almost_equal(details['cvg total duration'], 19., decimal=7)
+    npt.assert_almost_equal(details['cvg intersection duration'], 10., decimal=7)
+    npt.assert_almost_equal(details['pty total duration'], 19., decimal=7)
+    npt.assert_almost_equal(details['pty intersection duration'], 17., decimal=7)
+    purity, coverage, fmeasure = metric.compute_metrics(detail=details)
+    npt.assert_almost_equal(purity, 0.8947, decimal=3)
+    npt.assert_almost_equal(coverage, 0.5263, decimal=3)
+    npt.assert_almost_equal(fmeasure, 0.6628, decimal=3)
+
+
+# Time        0  1  2  3  4  5  6  7  8  9 10
+# Reference   |--|--|-----|-----------|-----|
+# Hypothesis  |-----|--|---|--------|-------|
+
+
+@pytest.fixture
+def reference_timeline():
+    reference = Timeline()
+    reference.add(Segment(0, 1))
+    reference.add(Segment(1, 2))
+    reference.add(Segment(2, 4))
+    reference.add(Segment(4, 8))
+    reference.add(Segment(8, 10))
+    return reference
+
+
+@pytest.fixture
+def hypothesis_timeline():
+    hypothesis = Timeline()
+    hypothesis.add(Segment(0, 2))
+    hypothesis.add(Segment(2, 3))
+    hypothesis.add(Segment(3, 4.5))
+    hypothesis.add(Segment(4.5, 7.5))
+    hypothesis.add(Segment(7.5, 10))
+    return hypothesis
+
+
+def test_precision(reference_timeline, hypothesis_timeline):
+    segmentationPrecision = SegmentationPrecision()
+    precision = segmentationPrecision(reference_timeline, hypothesis_timeline)
+    npt.assert_almost_equal(precision, 0.25, decimal=7)
+
+
+def test_precision_tolerance(reference_timeline, hypothesis_timeline):
+    segmentationPrecision = SegmentationPrecision(tolerance=0.5)
+    precision = segmentationPrecision(reference_timeline, hypothesis_timeline)
+    npt.assert_almost_equal(precision, 0.75, decimal=7)
+
+
+def test_recall(reference_timeline, hypothesis_timeline):
+    segmentationRecall = SegmentationRecall()
+    recall = segmentationRecall(reference_timeline, hypothesis_timeline)
+    npt.assert_almost_equal(recall, 0.25, decimal=7)
+
+
+def test_recall_tolerance(reference_timeline, hypothesis_timeline):
+    segmentationRecall = SegmentationRecall(tolerance=0.5)
+    recall = segmentationRecall(reference_timeline, hypothesis_timeline)
+    npt.assert_almost_equal(recall, 0.75, decimal=7)
+
+
+def test_precision_greedy_matching():
+    # hypothesis boundary at 1.4 is closer to reference boundary at 1.5
+    # than to reference boundary at 1. and must be matched with it
+    reference = Timeline([Segment(0, 1), Segment(1, 1.5), Segment(1.5, 3)])
+    hypothesis = Timeline([Segment(0, 1.4), Segment(1.4, 3)])
+    segmentationPrecision = SegmentationPrecision(tolerance=0.5)
+    details = segmentationPrecision(reference, hypothesis, detailed=True)
+    npt.assert_almost_equal(details['number of matches'], 1, decimal=7)
+    npt.assert_almost_equal(details['number of boundaries'], 1, decimal=7)
+
+
+def test_precision_empty_hypothesis(reference_timeline):
+    segmentationPrecision = SegmentationPrecision()
+    details = segmentationPrecision(reference_timeline, Timeline(),
+                                    detailed=True)
+    npt.assert_almost_equal(details['number of boundaries'], 0, decimal=7)
+    npt.assert_almost_equal(details['segmentation precision'], 1., decimal=7)
+
+
+def test_precision_long_recording():
+    # boundaries 1ms apart, 10 hours into the recording, must not be
+    # matched with a 0.5ms tolerance (this would fail with float32 timestamps)
+    reference = Timeline([Segment(0, 36000.), Segment(36000., 36010.)])
+    hypothesis = Timeline([Segment(0, 36000.001), Segment(36000.001, 36010.)])
+    segmentationPrecision = SegmentationPrecision(tolerance=0.0005)
+    details = segmentationPrecision(reference, hypothesis, detailed=True)
+    npt.assert_almost_equal(details['number of matches'], 0, decimal=7)
+
+
+def test_batch_details(reference_timeline, hypothesis_timeline):
+    references = [reference_timeline, reference_timeline, Timeline()]
+    hypotheses = [hypothesis_timeline, reference_timeline, hypothesis_timeline]
+    for metric in [SegmentationPrecision(tolerance=0.5),
+                   SegmentationRecall(tolerance=0.5)]:
+        details = metric.batch_details(references, hypotheses)
+        assert details == [metric.compute_components(reference, hypothesis)
+                           for reference, hypothesis
+                           in zip(references, hypotheses)]
+
+
+def _timeline(boundaries):
+    """Timeline whose internal boundaries are `boundaries`"""
+    times = [0.] + list(boundaries) + [max(boundaries, default=0.) + 1.]
+    return Timeline([Segment(start, end)
+                     for start, end in zip(times[:-1], times[1:])])
+
+
+def test_batch_details_separated():
+    # boundaries of consecutive files are close to each other across files:
+    # they must not be matched together
+    references = [_timeline([1., 2., 3.]),
+                  _timeline([3., 9.5]),
+                  _timeline([12., 14.])]
+    hypotheses = [_timeline([1.05, 2.5, 2.95]),
+                  _timeline([7., 8.]),
+                  _timeline([9.55, 20.])]
+    metric = SegmentationPrecision(tolerance=0.1)
+    details = metric.batch_details(references, hypotheses)
+    assert [d['number of matches'] for d in details] == [2., 0., 0.]
+    assert [d['number of boundaries'] for d in details] == [3, 2, 2]
+    assert details == [metric.compute_components(reference, hypothesis)
+                       for reference, hypothesis
+                       in zip(references, hypotheses)]
+
+
+def test_batch_details_zero_tolerance():
+    references = [_timeline([1., 2.]), _timeline([3., 5.])]
+    hypotheses = [_timeline([2., 3.]), _timeline([1., 5.])]
+    for metric, matches in [(SegmentationPrecision(tolerance=0.), [1., 1.]),
+                            (SegmentationRecall(tolerance=0.), [1., 1.])]:
+        details = metric.batch_details(references, hypotheses)
+        assert [d['number of matches'] for d in details] == matches
+
+
+def test_batch_details_separated_and_greedy():
+    # first file goes through the vectorized (separated) path, second file
+    # has boundaries too close to each other and goes through greedy matching
+    references = [_timeline([1., 2., 3.]), _timeline([1., 1.15])]
+    hypotheses = [_timeline([1.05, 3.2]), _timeline([1.1])]
+    metric = SegmentationPrecision(tolerance=0.1)
+    details = metric.batch_details(references, hypotheses)
+    assert [d['number of matches'] for d in details] == [1., 1.]
+    assert details == [metric.compute_components(reference, hypothesis)
+                       for reference, hypothesis
+                       in zip(references, hypotheses)]
+
+
+def test_batch_details_length_mismatch(reference_timeline):
+    metric = SegmentationPrecision()
+    with pytest.raises(ValueError, match='one hypothesis per reference'):
+        metric.batch_details([reference_timeline, reference_timeline],
+                             [reference_timeline])